@@ -1,26 +1,32 @@
 # data-collector/collector.py
 import os
+import math
+import functools
 import time
 import logging
 import yaml
 from datetime import datetime, timedelta, timezone
 from influxdb_client import InfluxDBClient
 from influxdb_client.client.exceptions import InfluxDBError
-from flask import Flask, jsonify
-import schedule
+from influxdb_client.client.write_api import SYNCHRONOUS
+from influxdb_client.rest import ApiException
+from urllib3 import Retry
+from flask import Flask
+from dotenv import load_dotenv
+from waitress import serve
+import orjson
+import signal
 import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Load .env file
 def load_env_file():
     """Load environment variables from .env file"""
     env_path = os.path.join(os.path.dirname(__file__), '.env')
     if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key] = value
+        # python-dotenv handles quoting, escapes and inline comments; .env values take precedence
+        load_dotenv(env_path, override=True)
 
 # Load .env file before importing other modules that might need env vars
 load_env_file()
@@ -44,16 +50,79 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Line protocol escaping (measurement names and tag keys/values)
+LP_ESCAPE_MEASUREMENT = str.maketrans({',': r'\,', ' ': r'\ ', '\n': r'\n', '\t': r'\t', '\r': r'\r'})
+LP_ESCAPE_TAG = str.maketrans({',': r'\,', '=': r'\=', ' ': r'\ ', '\n': r'\n', '\t': r'\t', '\r': r'\r'})
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def escape_tag_value(value):
+    """Escape a tag value; a trailing backslash is padded so it can't escape the next separator"""
+    escaped = value.translate(LP_ESCAPE_TAG)
+    if escaped.endswith('\\'):
+        escaped += ' '
+    return escaped
+
+# Flux columns that are never copied to the central point as extra tags
+EXCLUDED_TAG_KEYS = frozenset({'result', 'table', '_start', '_stop', '_time', '_value', '_field', '_measurement', 'host'})
+
+# Seconds between periodic connection re-tests in run_continuous
+HEALTH_CHECK_INTERVAL = 3600
+
+# Seconds a serialized /health payload is reused across probes
+STATUS_CACHE_TTL = 1.0
+
+# Consecutive failed collections before a source is disabled; disabled sources are
+# retried after COLLECTOR_INTERVAL * 2^n seconds, capped at HEALTH_CHECK_INTERVAL
+MAX_CONSECUTIVE_FAILURES = 10
+
+# Retry transient source query failures (connection errors, 429/5xx) with exponential backoff;
+# 4xx responses such as Flux syntax errors are not retried
+QUERY_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({'GET', 'POST'}),
+    raise_on_status=False
+)
+
+# Line-protocol lines per POST to the central InfluxDB
+WRITE_BATCH_SIZE = 5000
+
+# Persistent HTTP connection pool per InfluxDB client (reused across cycles)
+CONNECTION_POOL_MAXSIZE = 32
+
+# Standardized hostname mapping
+HOSTNAME_MAPPING = {
+    'server_a': 'pod_8',
+    'server_b': 'pod_30'
+}
+
+@functools.lru_cache(maxsize=1024)
+def _override_hostname(server_name, original_hostname):
+    """Memoized hostname override - the same few (server, host) pairs repeat on every record"""
+    # Jika hostname unknown atau kosong, gunakan mapping berdasarkan server
+    if original_hostname == 'unknown' or not original_hostname:
+        return HOSTNAME_MAPPING.get(server_name, f"unknown_{server_name}")
+
+    # Untuk server tertentu, override dengan mapping standar
+    if server_name in HOSTNAME_MAPPING:
+        return HOSTNAME_MAPPING[server_name]
+
+    return original_hostname.lower().replace('-', '_')
+
 class CentralDataCollector:
     def __init__(self):
         self.load_config()
         self.setup_clients()
         self.load_queries()
+        self.setup_executor()
+        self.stop_event = threading.Event()
         self.metrics_collected = 0
         self.last_collection = None
+        self._status_cache = (0.0, b'')  # (monotonic time, serialized status)
         self.collection_stats = {
-            'server_a': {'success': 0, 'failed': 0, 'last_points': 0, 'last_hosts': []},
-            'server_b': {'success': 0, 'failed': 0, 'last_points': 0, 'last_hosts': []}
+            'server_a': {'success': 0, 'failed': 0, 'consecutive_failures': 0, 'last_points': 0, 'last_hosts': []},
+            'server_b': {'success': 0, 'failed': 0, 'consecutive_failures': 0, 'last_points': 0, 'last_hosts': []}
         }
         
     def load_config(self):
@@ -72,7 +141,8 @@ class CentralDataCollector:
                 'org': os.getenv('SERVER_A_ORG'),
                 'buckets': [os.getenv('SERVER_A_BUCKET')],  # Single bucket
                 'enabled': True,
-                'last_success': None
+                'last_success': None,
+                'retry_at': 0.0  # monotonic time a disabled source is next retried
             },
             'server_b': {
                 'url': os.getenv('SERVER_B_URL'),
@@ -83,7 +153,8 @@ class CentralDataCollector:
                     os.getenv('SERVER_B_BUCKET_2')       # power_monitoring
                 ],
                 'enabled': True,
-                'last_success': None
+                'last_success': None,
+                'retry_at': 0.0  # monotonic time a disabled source is next retried
             }
         }
         
@@ -97,9 +168,14 @@ class CentralDataCollector:
             self.central_client = InfluxDBClient(
                 url=self.central_config['url'],
                 token=self.central_config['token'],
-                org=self.central_config['org']
+                org=self.central_config['org'],
+                enable_gzip=True,
+                connection_pool_maxsize=CONNECTION_POOL_MAXSIZE
             )
-            self.central_write_api = self.central_client.write_api()
+            self.central_client.api_client.set_default_header('Connection', 'keep-alive')
+            # Single write API for the life of the process - never re-created. Synchronous so each
+            # write() is exactly the POSTs we issue and write errors are raised to the caller
+            self.central_write_api = self.central_client.write_api(write_options=SYNCHRONOUS)
             logger.info("✅ Central InfluxDB client configured")
         except Exception as e:
             logger.error(f"❌ Failed to configure central client: {e}")
@@ -113,8 +189,12 @@ class CentralDataCollector:
                     self.source_clients[name] = InfluxDBClient(
                         url=config['url'],
                         token=config['token'],
-                        org=config['org']
+                        org=config['org'],
+                        enable_gzip=True,
+                        connection_pool_maxsize=CONNECTION_POOL_MAXSIZE,
+                        retries=QUERY_RETRY
                     )
+                    self.source_clients[name].api_client.set_default_header('Connection', 'keep-alive')
                     logger.info(f"✅ Client configured for {name} with {len(config['buckets'])} buckets")
                 except Exception as e:
                     logger.error(f"❌ Failed to configure client for {name}: {e}")
@@ -126,6 +206,8 @@ class CentralDataCollector:
             config_path = os.path.join(os.path.dirname(__file__), 'config', 'queries.yaml')
             with open(config_path, 'r') as f:
                 self.queries = yaml.safe_load(f)
+            if not isinstance(self.queries, dict) or not isinstance(self.queries.get('queries'), dict):
+                raise ValueError("expected a top-level 'queries' mapping")
             logger.info("✅ Query configuration loaded")
         except Exception as e:
             logger.error(f"❌ Failed to load query configuration: {e}")
@@ -169,24 +251,34 @@ class CentralDataCollector:
                     }
                 }
             }
+        
+        # Precompile templates once: escape literal Flux braces, then turn placeholders into format fields
+        for query_name, query_config in list(self.queries['queries'].items()):
+            if not isinstance(query_config, dict) or not query_config.get('flux_query'):
+                logger.error(f"❌ Query {query_name} has no flux_query, skipping")
+                del self.queries['queries'][query_name]
+                continue
+            query_config['_template'] = query_config['flux_query'].replace(
+                '{', '{{'
+            ).replace(
+                '}', '}}'
+            ).replace(
+                '{{{{ bucket }}}}', '{bucket}'
+            ).replace(
+                '{{{{ minutes }}}}', '{minutes}'
+            )
+    
+    def setup_executor(self):
+        """Setup thread pool for concurrent source queries"""
+        # One worker per (server, bucket, query) so a whole cycle is fetched in ~1 RTT
+        total_buckets = sum(len(config['buckets']) for config in self.sources.values())
+        max_workers = max(1, total_buckets * len(self.queries['queries']))
+        self.query_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='query')
+        logger.info(f"✅ Query executor configured with {max_workers} workers")
     
     def override_hostname(self, server_name, original_hostname):
         """Override hostname based on server and standardize naming"""
-        # Standardized hostname mapping
-        hostname_mapping = {
-            'server_a': 'pod_8',
-            'server_b': 'pod_30'
-        }
-
-        # Jika hostname unknown atau kosong, gunakan mapping berdasarkan server
-        if original_hostname == 'unknown' or not original_hostname:
-            return hostname_mapping.get(server_name, f"unknown_{server_name}")
-
-        # Untuk server tertentu, override dengan mapping standar
-        if server_name in hostname_mapping:
-            return hostname_mapping[server_name]
-
-        return original_hostname.lower().replace('-', '_')
+        return _override_hostname(server_name, original_hostname)
     
     def test_connections(self):
         """Test connection to all servers"""
@@ -206,23 +298,12 @@ class CentralDataCollector:
             logger.error(f"❌ Central InfluxDB: Connection failed - {e}")
         
         # Test source connections
+        healthy_servers = []
         for server_name, client in self.source_clients.items():
             try:
                 health = client.health()
                 if health.status == "pass":
-                    # Test each bucket
-                    bucket_status = []
-                    for bucket in self.sources[server_name]['buckets']:
-                        try:
-                            test_query = f'from(bucket: "{bucket}") |> range(start: -1m) |> limit(n: 1)'
-                            client.query_api().query(test_query)
-                            bucket_status.append(f"✅ {bucket}")
-                        except Exception as e:
-                            bucket_status.append(f"❌ {bucket}: {str(e)}")
-                    
-                    logger.info(f"✅ {server_name}: Healthy - Buckets: {', '.join(bucket_status)}")
-                    results['sources'][server_name] = True
-                    self.sources[server_name]['enabled'] = True
+                    healthy_servers.append(server_name)
                 else:
                     logger.error(f"❌ {server_name}: Unhealthy - {health.message}")
                     results['sources'][server_name] = False
@@ -232,10 +313,36 @@ class CentralDataCollector:
                 results['sources'][server_name] = False
                 self.sources[server_name]['enabled'] = False
         
+        # Test each bucket of every healthy server concurrently
+        probe_tasks = [
+            (server_name, bucket)
+            for server_name in healthy_servers
+            for bucket in self.sources[server_name]['buckets']
+        ]
+        futures = [self.query_executor.submit(self.probe_bucket, *task) for task in probe_tasks]
+        bucket_status = defaultdict(list)
+        for (server_name, _), future in zip(probe_tasks, futures):
+            bucket_status[server_name].append(future.result())
+        
+        for server_name in healthy_servers:
+            logger.info(f"✅ {server_name}: Healthy - Buckets: {', '.join(bucket_status[server_name])}")
+            results['sources'][server_name] = True
+            self.sources[server_name]['enabled'] = True
+            self.collection_stats[server_name]['consecutive_failures'] = 0
+        
         return results
     
+    def probe_bucket(self, server_name, bucket):
+        """Run a minimal test query against a bucket and return its status line"""
+        try:
+            test_query = f'from(bucket: "{bucket}") |> range(start: -1m) |> limit(n: 1)'
+            self.source_clients[server_name].query_api().query(test_query)
+            return f"✅ {bucket}"
+        except Exception as e:
+            return f"❌ {bucket}: {str(e)}"
+    
     def execute_query(self, server_name, bucket_name, query_name):
-        """Execute a specific query against a source server and bucket"""
+        """Execute a specific query against a source server and bucket (None if the query failed)"""
         if not self.sources[server_name]['enabled']:
             return []
             
@@ -246,120 +353,162 @@ class CentralDataCollector:
                 return []
             
             # Render query template
-            flux_query = query_config['flux_query'].replace(
-                '{{ bucket }}', bucket_name
-            ).replace(
-                '{{ minutes }}', str(query_config.get('minutes', 5))
+            flux_query = query_config['_template'].format(
+                bucket=bucket_name,
+                minutes=query_config.get('minutes', 5)
             )
             
             client = self.source_clients[server_name]
             query_api = client.query_api()
             
             logger.debug(f"Executing {query_name} for {server_name} bucket {bucket_name}")
-            result = query_api.query(flux_query)
+            # Stream records one at a time instead of materializing FluxTables
+            records = query_api.query_stream(flux_query)
             
-            return result
+            return records
             
+        except ApiException as e:
+            # Returned by the server after retries - 4xx means the query itself is wrong
+            kind = "rejected" if e.status and 400 <= e.status < 500 else "failed"
+            logger.error(f"❌ bucket {bucket_name} query {query_name} {kind} (HTTP {e.status}): {e.message}")
+            return None
         except Exception as e:
             logger.error(f"❌ bucket {bucket_name} query {query_name} failed: {e}")
-            return []
+            return None
+    
+    def query_points(self, server_name, bucket_name, query_name):
+        """Execute a query and transform its records as they stream in (runs in the query executor)"""
+        records = self.execute_query(server_name, bucket_name, query_name)
+        if records is None:  # Query failed - already logged by execute_query
+            return None
+        return self.transform_data(records, server_name, bucket_name)
     
-    def transform_data(self, result, server_name, bucket_name):
-        """Transform query result to central format with hostname override"""
+    def transform_data(self, records, server_name, bucket_name):
+        """Transform query records to central line protocol with hostname override"""
         points = []
         original_hosts = set()
         final_hosts = set()
         
-        for table in result:
-            for record in table.records:
-                # Get original hostname
-                original_host = record.values.get('host', 'unknown')
-                original_hosts.add(original_host)
-                
-                # Override hostname
-                final_host = self.override_hostname(server_name, original_host)
-                final_hosts.add(final_host)
-                
-                # Build tags - fokus pada host untuk filtering, tanpa nama server
-                tags = {
-                    "host": final_host,  # Hostname yang sudah di-standarisasi
-                    "source_bucket": bucket_name,  # Track which bucket data came from
-                    "field": record.get_field(),
-                }
-                
-                # Add additional tags (excluding internal fields)
-                for key, value in record.values.items():
-                    if key not in ['result', 'table', '_start', '_stop', '_time', '_value', '_field', '_measurement', 'host']:
-                        if value is not None:
-                            tags[key] = str(value)
-                
-                point = {
-                    "measurement": f"{record.get_measurement()}",  # Simplified measurement name without server prefix
-                    "tags": tags,
-                    "fields": {
-                        "value": float(record.get_value()) if record.get_value() is not None else 0.0
-                    },
-                    "time": record.get_time()
-                }
-                points.append(point)
+        for record in records:
+            values = record.values
+            raw_value = record.get_value()
+            
+            # Field value - skip non-finite values, InfluxDB rejects NaN/Inf
+            field_value = float(raw_value) if raw_value is not None else 0.0
+            if not math.isfinite(field_value):
+                continue
+            
+            # Get original hostname
+            original_host = values.get('host', 'unknown')
+            original_hosts.add(original_host)
+            
+            # Override hostname
+            final_host = self.override_hostname(server_name, original_host)
+            final_hosts.add(final_host)
+            
+            # Build tags - fokus pada host untuk filtering, tanpa nama server
+            tags = {
+                "host": final_host,  # Hostname yang sudah di-standarisasi
+                "source_bucket": bucket_name,  # Track which bucket data came from
+                "field": record.get_field(),
+            }
+            
+            # Add additional tags (excluding internal fields)
+            for key, value in values.items():
+                if key not in EXCLUDED_TAG_KEYS and value is not None:
+                    tags[key] = str(value)
+            
+            # Serialize straight to line protocol (no dict -> Point -> line protocol round trip)
+            measurement = f"{record.get_measurement()}".translate(LP_ESCAPE_MEASUREMENT)  # Simplified measurement name without server prefix
+            tag_set = ','.join(
+                f"{key.translate(LP_ESCAPE_TAG)}={escape_tag_value(value)}"
+                for key, value in sorted(tags.items()) if value
+            )
+            record_time = values.get('_time')
+            if record_time is None:
+                # No _time column (e.g. query without aggregateWindow) - let the server assign the time
+                points.append(f"{measurement},{tag_set} value={field_value!r}")
+            else:
+                timestamp_ns = (record_time - EPOCH) // timedelta(microseconds=1) * 1000
+                points.append(f"{measurement},{tag_set} value={field_value!r} {timestamp_ns}")
         
         if points:
             logger.info(f"🔧 Transformed {len(points)} points from {bucket_name}. Host mapping: {original_hosts} → {final_hosts}")
         
-        return points
+        return points, final_hosts
     
     def collect_from_source(self, server_name):
         """Collect data from a single source server - multiple buckets"""
         if not self.sources[server_name]['enabled']:
-            return 0
+            if time.monotonic() < self.sources[server_name]['retry_at']:
+                return 0
+            # Backoff elapsed - give the source another try instead of waiting for the hourly re-test
+            logger.info(f"🔁 {server_name}: Retrying disabled source")
+            self.sources[server_name]['enabled'] = True
             
         total_points = 0
         unique_hosts = set()
         bucket_points = {}
+        pending = defaultdict(list)
         
         try:
-            # Collect from each bucket
+            # Build all (bucket, query) tasks upfront, skipping empty bucket names
+            tasks = [
+                (server_name, bucket_name, query_name)
+                for bucket_name in self.sources[server_name]['buckets'] if bucket_name
+                for query_name in self.queries['queries'].keys()
+            ]
             for bucket_name in self.sources[server_name]['buckets']:
-                if not bucket_name:  # Skip empty bucket names
-                    continue
+                if bucket_name:
+                    logger.info(f"📦 Collecting from bucket: {bucket_name}")
+                    bucket_points[bucket_name] = 0
+            
+            # Execute ALL queries for each bucket concurrently (no filtering)
+            futures = {self.query_executor.submit(self.query_points, *task): task for task in tasks}
+            failed_queries = 0
+            
+            for future in as_completed(futures):
+                _, bucket_name, query_name = futures[future]
+                try:
+                    result = future.result()
+                    if result is None:
+                        failed_queries += 1
+                        continue
+                    points, hosts = result
                     
-                bucket_total = 0
-                logger.info(f"📦 Collecting from bucket: {bucket_name}")
-                
-                # Execute ALL queries for each bucket (no filtering)
-                for query_name in self.queries['queries'].keys():
-                    try:
-                        result = self.execute_query(server_name, bucket_name, query_name)
+                    # Track unique hosts
+                    unique_hosts |= hosts
+                    
+                    # Queue for central InfluxDB - Use source bucket name as central bucket
+                    if points:
+                        pending[bucket_name].extend(points)
                         
-                        if result:
-                            points = self.transform_data(result, server_name, bucket_name)
-                            
-                            # Track unique hosts
-                            for point in points:
-                                if 'host' in point['tags']:
-                                    unique_hosts.add(point['tags']['host'])
-                            
-                            # Write to central InfluxDB - Use source bucket name as central bucket
-                            if points:
-                                # Use source bucket name as central bucket name for better organization
-                                central_bucket = bucket_name
-                                try:
-                                    self.central_write_api.write(
-                                        bucket=central_bucket,
-                                        record=points
-                                    )
-                                    bucket_total += len(points)
-                                    total_points += len(points)
-                                    logger.debug(f"📊 {len(points)} points written to {central_bucket}")
-                                except Exception as e:
-                                    logger.error(f"❌ Failed to write {len(points)} points to {central_bucket}: {e}")
-                                    continue
-                                
+                except Exception as e:
+                    logger.error(f"❌ Query {query_name} failed for bucket {bucket_name}: {e}")
+                    failed_queries += 1
+                    continue
+            
+            # Every query failing usually means the source is down - record it, but keep querying
+            # every cycle so collection resumes as soon as the source is back
+            if tasks and failed_queries == len(tasks):
+                logger.warning(f"⚠️ {server_name}: All {len(tasks)} queries failed")
+                self.collection_stats[server_name]['failed'] += 1
+            
+            # Write to central InfluxDB - one POST per WRITE_BATCH_SIZE points per central bucket per cycle
+            for central_bucket, points in pending.items():
+                for start in range(0, len(points), WRITE_BATCH_SIZE):
+                    batch = points[start:start + WRITE_BATCH_SIZE]
+                    try:
+                        self.central_write_api.write(
+                            bucket=central_bucket,
+                            record=batch
+                        )
+                        bucket_points[central_bucket] += len(batch)
+                        total_points += len(batch)
+                        logger.debug(f"📊 {len(batch)} points written to {central_bucket}")
                     except Exception as e:
-                        logger.error(f"❌ Query {query_name} failed for bucket {bucket_name}: {e}")
+                        logger.error(f"❌ Failed to write {len(batch)} points to {central_bucket}: {e}")
                         continue
-                
-                bucket_points[bucket_name] = bucket_total
             
             if total_points > 0:
                 hosts_list = ", ".join(sorted(unique_hosts)) if unique_hosts else "unknown"
@@ -370,15 +519,26 @@ class CentralDataCollector:
                 self.collection_stats[server_name]['last_hosts'] = list(unique_hosts)
                 self.collection_stats[server_name]['last_buckets'] = bucket_points
                 self.sources[server_name]['last_success'] = datetime.now(timezone.utc)
+                self.collection_stats[server_name]['consecutive_failures'] = 0
             else:
                 logger.warning(f"⚠️ No data collected from any bucket")
-                
+            
             return total_points
                 
         except Exception as e:
             logger.error(f"❌ {server_name}: Collection failed - {e}")
-            self.collection_stats[server_name]['failed'] += 1
-            self.sources[server_name]['enabled'] = False
+            stats = self.collection_stats[server_name]
+            stats['failed'] += 1
+            stats['consecutive_failures'] += 1
+            # Only disable after repeated failures so a transient error doesn't drop the source
+            if stats['consecutive_failures'] >= MAX_CONSECUTIVE_FAILURES:
+                retry_delay = min(
+                    self.interval * 2 ** (stats['consecutive_failures'] - MAX_CONSECUTIVE_FAILURES),
+                    HEALTH_CHECK_INTERVAL
+                )
+                logger.error(f"❌ {server_name}: Disabled after {stats['consecutive_failures']} consecutive failures, retrying in {retry_delay}s")
+                self.sources[server_name]['enabled'] = False
+                self.sources[server_name]['retry_at'] = time.monotonic() + retry_delay
             return 0
     
     def collect_all_sources(self):
@@ -386,8 +546,11 @@ class CentralDataCollector:
         total_points = 0
         logger.info("🔄 Starting data collection cycle...")
         
-        for server_name in self.source_clients.keys():
-            points_collected = self.collect_from_source(server_name)
+        # Source servers are independent endpoints - collect them concurrently
+        with ThreadPoolExecutor(max_workers=max(1, len(self.source_clients)), thread_name_prefix='source') as executor:
+            results = list(executor.map(self.collect_from_source, self.source_clients.keys()))
+        
+        for points_collected in results:
             total_points += points_collected
             self.metrics_collected += points_collected
         
@@ -399,9 +562,9 @@ class CentralDataCollector:
         """Get collector status for health endpoint"""
         status = {
             'status': 'healthy',
-            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'timestamp': datetime.now(timezone.utc),
             'metrics_collected_total': self.metrics_collected,
-            'last_collection': self.last_collection.isoformat() if self.last_collection else None,
+            'last_collection': self.last_collection,
             'collection_interval': self.interval,
             'sources': {}
         }
@@ -410,7 +573,7 @@ class CentralDataCollector:
             status['sources'][server_name] = {
                 'enabled': config['enabled'],
                 'buckets': config['buckets'],
-                'last_success': config['last_success'].isoformat() if config['last_success'] else None,
+                'last_success': config['last_success'],
                 'stats': self.collection_stats[server_name]
             }
             
@@ -420,6 +583,15 @@ class CentralDataCollector:
         
         return status
     
+    def get_status_json(self):
+        """Get serialized status, rebuilt at most once per STATUS_CACHE_TTL"""
+        now = time.monotonic()
+        cached_at, payload = self._status_cache
+        if not payload or now - cached_at >= STATUS_CACHE_TTL:
+            payload = orjson.dumps(self.get_status())
+            self._status_cache = (now, payload)
+        return payload
+    
     def run_continuous(self):
         """Run continuous collection"""
         logger.info(f"🚀 Starting continuous collection every {self.interval} seconds")
@@ -429,55 +601,68 @@ class CentralDataCollector:
         enabled_servers = [k for k, v in self.sources.items() if v['enabled']]
         logger.info(f"📡 Monitoring {len(enabled_servers)} data sources")
         
-        # Schedule collection
-        schedule.every(self.interval).seconds.do(self.collect_all_sources)
+        # Stop waiting immediately on SIGTERM (e.g. docker stop)
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop_event.set())
         
-        # Run immediately first time
-        self.collect_all_sources()
+        self._next_health_check = time.monotonic() + HEALTH_CHECK_INTERVAL
         
-        # Main loop
-        while True:
-            try:
-                schedule.run_pending()
-                time.sleep(1)
-                
-                # Re-test connections every hour
-                if self.metrics_collected % (3600 // self.interval) == 0:
-                    self.test_connections()
+        # Main loop - sleep until the next run instead of polling; first run is immediate
+        next_run = time.monotonic()
+        try:
+            while not self.stop_event.wait(max(0, next_run - time.monotonic())):
+                try:
+                    self.collect_all_sources()
                     
-            except KeyboardInterrupt:
-                logger.info("⏹️ Collection stopped by user")
-                break
-            except Exception as e:
-                logger.error(f"💥 Unexpected error: {e}")
-                time.sleep(30)
+                    # Re-test connections every hour
+                    if time.monotonic() >= self._next_health_check:
+                        self.test_connections()
+                        self._next_health_check = time.monotonic() + HEALTH_CHECK_INTERVAL
+                        
+                except Exception as e:
+                    logger.error(f"💥 Unexpected error: {e}")
+                
+                # Skip runs missed by an overlong cycle instead of bursting to catch up
+                next_run = max(next_run + self.interval, time.monotonic())
+        except KeyboardInterrupt:
+            logger.info("⏹️ Collection stopped by user")
+        else:
+            logger.info("⏹️ Collection stopped by signal")
+        
+        # Release worker threads and pooled connections before exit
+        self.query_executor.shutdown(wait=False)
+        self.central_write_api.close()
+        self.central_client.close()
 
 # Flask routes for health checks
 collector_instance = None
 
+def json_response(payload, status=200):
+    """Serialize payload with orjson (datetimes are encoded natively as ISO 8601)"""
+    return app.response_class(orjson.dumps(payload), status=status, mimetype='application/json')
+
 @app.route('/health')
 def health():
     if collector_instance:
-        return jsonify(collector_instance.get_status())
+        return app.response_class(collector_instance.get_status_json(), mimetype='application/json')
     else:
-        return jsonify({'status': 'initializing'}), 503
+        return json_response({'status': 'initializing'}, 503)
 
 @app.route('/metrics')
 def metrics():
     """Simple metrics endpoint"""
     if collector_instance:
         status = collector_instance.get_status()
-        return jsonify({
+        return json_response({
             'metrics_collected_total': status['metrics_collected_total'],
             'sources_count': len(status['sources']),
             'enabled_sources': len([s for s in status['sources'].values() if s['enabled']])
         })
     else:
-        return jsonify({'error': 'Collector not initialized'}), 503
+        return json_response({'error': 'Collector not initialized'}, 503)
 
 def start_flask_app():
-    """Start Flask app in a separate thread"""
-    app.run(host='0.0.0.0', port=collector_instance.health_port, debug=False)
+    """Start Flask app on the waitress WSGI server in a separate thread"""
+    serve(app, host='0.0.0.0', port=collector_instance.health_port, threads=4)
 
 if __name__ == "__main__":
     # Initialize collector